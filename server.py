@@ -1,15 +1,18 @@
 """
 FastAPI application for a simple exam simulation coach.
 
-This API exposes three endpoints:
+This API exposes four endpoints:
 
-* **GET /** – serves the single‑page web application from the `static/index.html` file.
+* **GET /** – serves the single‑page web application from the `static/index.html` file
+  (read once at startup and served from memory with an ETag).
 * **POST /generate** – returns a dummy exam paper with a small mix of
   multiple‑choice, short‑answer and calculation questions.  In a real
   implementation you would connect this to an LLM or question bank.
-* **POST /mark_bundle** – accepts the paper and a dictionary of answers
-  and returns marking information with per‑question feedback and
-  total marks awarded.
+* **POST /mark_bundle** – accepts the paper and a list of answers
+  aligned with it (an index‑keyed dictionary is still accepted) and
+  returns marking information with per‑question feedback and total
+  marks awarded.
+* **POST /mark_bundle/batch** – marks many bundles in one request.
 
 The dummy implementation here is deliberately straightforward so that
 you can deploy it quickly on a hosting platform such as Railway,
@@ -18,23 +21,62 @@ Render or Fly.io.  The core logic lives entirely within this file.
 To run locally:
 
 ```bash
-pip install fastapi uvicorn pydantic
+pip install fastapi 'uvicorn[standard]' pydantic orjson
 uvicorn server:app --reload
 ```
 
 Then open http://127.0.0.1:8000/ in your browser.
+
+For production, run with uvloop (an event loop built on libuv) and
+httptools (a C HTTP parser), without the per‑request access log and
+with one worker per CPU.  Neither needs changes to the handlers; both
+cut the framework overhead that dominates small requests such as
+``/generate`` and ``/mark_bundle``:
+
+```bash
+uvicorn server:app --loop uvloop --http httptools --no-access-log --workers 4
+```
+
+``python server.py`` does the same with one worker per CPU.  Under
+gunicorn the equivalent is:
+
+```bash
+pip install gunicorn uvicorn-worker
+gunicorn server:app -k uvicorn_worker.UvicornWorker -w 4 -b 0.0.0.0:8000
+```
+
+(the uvicorn worker class picks uvloop and httptools automatically when
+they are installed).
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Union
+from functools import lru_cache
+import asyncio
+import hashlib
 import os
 import re
 
+import orjson
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson's C encoder instead of ``json``."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+app = FastAPI(title="Exam Simulation Coach", default_response_class=ORJSONResponse)
 
-app = FastAPI(title="Exam Simulation Coach")
+# Submissions with more questions or more answer text than this are
+# marked in the default executor so that a single large submission
+# cannot stall the event loop.
+EXECUTOR_MARKING_THRESHOLD = 32
+EXECUTOR_ANSWER_CHARS_THRESHOLD = 16_384
 
 # --- Data models -----------------------------------------------------------
 
@@ -69,14 +111,56 @@ class MarkBundle(BaseModel):
     """Bundle of paper and answers sent for marking."""
 
     paper: List[Question]
-    answers: Dict[int, str]
+    # One answer per question, in paper order.  An object keyed by
+    # question index is also accepted for older clients.
+    answers: Union[List[Optional[str]], Dict[str, str]]
+
+
+class MarkBatch(BaseModel):
+    """Several bundles sent for marking in a single request."""
+
+    bundles: List[MarkBundle]
 
 
 # --- Dummy exam generation -------------------------------------------------
 
-def generate_dummy_exam(board: str, level: str, subject: str, topics: Optional[List[str]]) -> List[Dict]:
+# The fixed paper returned by generate_dummy_exam.  It is built once and
+# shared between requests, so treat it as read‑only (copy.deepcopy it
+# before making changes).
+_DUMMY_QUESTIONS: Tuple[Dict, ...] = (
+    {
+        "type": "mcq",
+        "stem": "Which process converts light energy into chemical energy in plants?",
+        "marks": 1,
+        "options": (
+            "A. Photosynthesis",
+            "B. Respiration",
+            "C. Osmosis",
+            "D. Fermentation",
+        ),
+        "answer_key": "A",
+    },
+    {
+        "type": "short",
+        "stem": "Define osmosis.",
+        "marks": 3,
+        "expected_keywords": ("diffusion", "water", "partially permeable membrane"),
+        "model_answer": "Diffusion of water through a partially permeable membrane.",
+    },
+    {
+        "type": "calc",
+        "stem": "A 2 kg mass is lifted 1.5 m in a gravitational field where g = 9.8 m/s². Calculate the increase in gravitational potential energy (GPE).",
+        "marks": 6,
+        "steps_keywords": ("GPE = mgh", "2×9.8×1.5", "= 29.4"),
+        "final_answer": "29.4 J",
+        "model_method": ("Use GPE = mgh", "m = 2 kg", "g = 9.8 m/s²", "h = 1.5 m", "GPE = 2×9.8×1.5 = 29.4 J"),
+    },
+)
+
+
+def generate_dummy_exam(board: str, level: str, subject: str, topics: Optional[List[str]]) -> Tuple[Dict, ...]:
     """
-    Return a list of question dicts.  In a production system this
+    Return a sequence of question dicts.  In a production system this
     function would talk to a language model or consult a database of
     past papers.  For now we return a fixed set of questions to
     demonstrate the flow.
@@ -88,109 +172,165 @@ def generate_dummy_exam(board: str, level: str, subject: str, topics: Optional[L
         topics: A list of topics to cover (unused).
 
     Returns:
-        A list of dictionaries, each representing a question.
+        A tuple of dictionaries, each representing a question.  The
+        tuple is shared between calls and must not be mutated.
     """
-    return [
-        {
-            "type": "mcq",
-            "stem": "Which process converts light energy into chemical energy in plants?",
-            "marks": 1,
-            "options": [
-                "A. Photosynthesis",
-                "B. Respiration",
-                "C. Osmosis",
-                "D. Fermentation",
-            ],
-            "answer_key": "A",
-        },
-        {
-            "type": "short",
-            "stem": "Define osmosis.",
-            "marks": 3,
-            "expected_keywords": ["diffusion", "water", "partially permeable membrane"],
-            "model_answer": "Diffusion of water through a partially permeable membrane.",
-        },
-        {
-            "type": "calc",
-            "stem": "A 2 kg mass is lifted 1.5 m in a gravitational field where g = 9.8 m/s². Calculate the increase in gravitational potential energy (GPE).",
-            "marks": 6,
-            "steps_keywords": ["GPE = mgh", "2×9.8×1.5", "= 29.4"],
-            "final_answer": "29.4 J",
-            "model_method": ["Use GPE = mgh", "m = 2 kg", "g = 9.8 m/s²", "h = 1.5 m", "GPE = 2×9.8×1.5 = 29.4 J"],
-        },
-    ]
+    return _DUMMY_QUESTIONS
 
 
 # --- Marking helpers -------------------------------------------------------
 
-def _has_kw(text: str, kw: str) -> bool:
-    """Return True if the keyword appears in the text, case‑insensitive."""
-    return kw.lower() in (text or "").lower()
+@lru_cache(maxsize=1024)
+def _build_scanner(keywords: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Return ``(keyword, lowered keyword)`` pairs for a keyword tuple.
+
+    Papers are reused across candidates, so the scanner for a given
+    keyword list is built once and shared between marking calls.  The
+    cache is LRU‑bounded so memory stays flat.
+    """
+    return tuple((kw, kw.lower()) for kw in keywords)
+
 
+@lru_cache(maxsize=4096)
+def _normalise_final_answer(final_answer: str) -> str:
+    """Return the final answer lower‑cased with spaces removed."""
+    return final_answer.lower().replace(" ", "")
 
-def mark_paper(questions: List[Dict], answers: Dict[int, str]) -> Dict:
+
+@lru_cache(maxsize=1024)
+def _lower_keywords(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the keywords lower‑cased, in the same order."""
+    return tuple(kw.lower() for kw in keywords)
+
+
+def _find_keywords(text: str, scanner: Tuple[Tuple[str, str], ...]) -> set:
     """
-    Given a list of question dictionaries and a mapping of question
-    indices to answers, compute the marks awarded and feedback.
+    Return the keywords from ``scanner`` that appear in ``text``.
+
+    The match is case‑insensitive.  The text is lower‑cased once and
+    every keyword is checked against that single copy, rather than
+    re‑lowering the whole text for each keyword.
+    """
+    text_l = (text or "").lower()
+    return {kw for kw, kw_l in scanner if kw_l in text_l}
+
+
+def _mark_mcq(q: Question, resp: str) -> Tuple[int, str]:
+    """Award full marks when the chosen option matches the answer key."""
+    answer_key = q.answer_key
+    if resp.strip().upper() == (answer_key or "").upper():
+        return q.marks, "Correct choice."
+    return 0, f"Correct answer: {answer_key}."
+
+
+def _mark_short(q: Question, resp: str) -> Tuple[int, str]:
+    """Award a mark per expected keyword found, up to the question's marks."""
+    expected = tuple(q.expected_keywords or ())
+    model_answer = q.model_answer
+    found = _find_keywords(resp, _build_scanner(expected))
+    awarded = min(sum(1 for kw in expected if kw in found), q.marks)
+    missing = [kw for kw in expected if kw not in found]
+    if not missing:
+        return awarded, f"Model answer: {model_answer}" if model_answer else ""
+    missing_msg = (
+        "Missing keywords: "
+        + ", ".join(missing[:3])
+        + ("..." if len(missing) > 3 else "")
+    )
+    if model_answer:
+        return awarded, f"{missing_msg} Model answer: {model_answer}"
+    return awarded, missing_msg
+
+
+def _mark_calc(q: Question, resp: str) -> Tuple[int, str]:
+    """Award a mark for each step keyword and a mark for the final answer."""
+    final_answer = q.final_answer
+    model_method = q.model_method
+    # The response is lower‑cased anyway for the final answer check, so
+    # match the (few) step keywords against that copy directly.
+    steps_l = _lower_keywords(tuple(q.steps_keywords or ()))
+    fa = _normalise_final_answer(final_answer or "")
+    resp_l = resp.lower()
+    method_found = sum(1 for kw in steps_l if kw in resp_l)
+    rr = resp_l.replace(" ", "")
+    final_ok = bool(fa) and fa in rr
+    awarded = min(method_found + (1 if final_ok else 0), q.marks)
+    method_msg = "Method: " + " | ".join(model_method) if model_method else ""
+    if final_ok or not final_answer:
+        return awarded, method_msg
+    if method_msg:
+        return awarded, f"Expected final answer: {final_answer} {method_msg}"
+    return awarded, f"Expected final answer: {final_answer}"
+
+
+def _mark_unknown(q: Question, resp: str) -> Tuple[int, str]:
+    """Award nothing for a question type the marker does not know."""
+    return 0, "Unknown question type; awarded 0 marks."
+
+
+# Scorer for each question type; each returns (marks awarded, feedback)
+_MARKERS = {
+    "mcq": _mark_mcq,
+    "short": _mark_short,
+    "calc": _mark_calc,
+}
+
+
+def _answers_as_list(answers: Dict[str, str], count: int) -> List[Optional[str]]:
+    """
+    Convert an index‑keyed answer mapping into a list of ``count`` answers.
+
+    Keys may be ints or numeric strings; keys that are not indices of
+    the paper are ignored.
+    """
+    as_list: List[Optional[str]] = [None] * count
+    for k, v in answers.items():
+        try:
+            i = int(k)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < count:
+            as_list[i] = v
+    return as_list
+
+
+def mark_paper(
+    questions: List[Question], answers: Union[List[Optional[str]], Dict[str, str]]
+) -> Dict:
+    """
+    Given a list of questions and the candidate's answers, compute the
+    marks awarded and feedback.
 
     Args:
-        questions: A list of question dictionaries (see generate_dummy_exam).
-        answers: A mapping from question index (int) to the candidate's answer.
+        questions: The questions making up the paper.
+        answers: The candidate's answers in paper order, with ``None``
+            (or a short list) for unanswered questions.  A mapping from
+            question index (an int or a numeric string) to answer is
+            also accepted.
 
     Returns:
         A dictionary with per‑question results and totals.
     """
+    if isinstance(answers, dict):
+        answers = _answers_as_list(answers, len(questions))
+    n_answers = len(answers)
     results = []
     total_awarded = 0
     total_max = 0
     for i, q in enumerate(questions):
-        resp = answers.get(i) or answers.get(str(i)) or ""
-        awarded = 0
-        feedback_parts = []
-        if q["type"] == "mcq":
-            if (resp.strip().upper() == (q.get("answer_key") or "").upper()):
-                awarded = q["marks"]
-                feedback_parts.append("Correct choice.")
-            else:
-                feedback_parts.append(f"Correct answer: {q.get('answer_key')}.")
-        elif q["type"] == "short":
-            # Count matching keywords for partial credit
-            expected = q.get("expected_keywords", [])
-            found = sum(1 for kw in expected if _has_kw(resp, kw))
-            awarded = min(found, q["marks"])
-            missing = [kw for kw in expected if not _has_kw(resp, kw)]
-            if missing:
-                feedback_parts.append(
-                    "Missing keywords: "
-                    + ", ".join(missing[:3])
-                    + ("..." if len(missing) > 3 else "")
-                )
-            if q.get("model_answer"):
-                feedback_parts.append("Model answer: " + q["model_answer"])
-        elif q["type"] == "calc":
-            # Award a mark for each step keyword and a mark for the final answer
-            steps = q.get("steps_keywords", [])
-            method_found = sum(1 for kw in steps if _has_kw(resp, kw))
-            fa = (q.get("final_answer") or "").lower().replace(" ", "")
-            rr = (resp or "").lower().replace(" ", "")
-            final_ok = bool(fa) and fa in rr
-            awarded = min(method_found + (1 if final_ok else 0), q["marks"])
-            if not final_ok and q.get("final_answer"):
-                feedback_parts.append(f"Expected final answer: {q['final_answer']}")
-            if q.get("model_method"):
-                feedback_parts.append("Method: " + " | ".join(q["model_method"]))
-        else:
-            feedback_parts.append("Unknown question type; awarded 0 marks.")
+        resp = (answers[i] if i < n_answers else None) or ""
+        awarded, feedback = _MARKERS.get(q.type, _mark_unknown)(q, resp)
         results.append(
             {
                 "q_index": i,
                 "awarded": awarded,
-                "max_marks": q["marks"],
-                "feedback": " ".join(feedback_parts),
+                "max_marks": q.marks,
+                "feedback": feedback,
             }
         )
         total_awarded += awarded
-        total_max += q["marks"]
+        total_max += q.marks
     return {
         "results": results,
         "total_awarded": total_awarded,
@@ -198,6 +338,39 @@ def mark_paper(questions: List[Dict], answers: Dict[int, str]) -> Dict:
     }
 
 
+def _is_large_submission(bundles: List[MarkBundle]) -> bool:
+    """Return True if the bundles should be marked off the event loop."""
+    questions = 0
+    chars = 0
+    for bundle in bundles:
+        questions += len(bundle.paper)
+        answers = bundle.answers
+        if isinstance(answers, dict):
+            answers = answers.values()
+        chars += sum(len(a or "") for a in answers)
+    return (
+        questions > EXECUTOR_MARKING_THRESHOLD
+        or chars > EXECUTOR_ANSWER_CHARS_THRESHOLD
+    )
+
+
+def mark_batch_bundles(bundles: List[MarkBundle]) -> List[Dict]:
+    """
+    Mark several bundles in a single pass.
+
+    Questions are marked directly from the validated models and the
+    keyword scanners are shared through their caches, so candidates
+    sitting the same paper only pay for marking their own answers.
+
+    Args:
+        bundles: The bundles to mark.
+
+    Returns:
+        One marking result per bundle, in input order.
+    """
+    return [mark_paper(bundle.paper, bundle.answers) for bundle in bundles]
+
+
 # --- Route handlers --------------------------------------------------------
 
 # Serve static assets from /static (e.g. index.html, JS, CSS)
@@ -205,26 +378,83 @@ static_dir = os.path.join(os.path.dirname(__file__), "static")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 
+def _etag(body: bytes) -> str:
+    """Return a strong ETag for a response body."""
+    return '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+# The landing page never changes while the server runs, so keep it in memory
+with open(os.path.join(static_dir, "index.html"), "rb") as f:
+    _INDEX_BYTES = f.read()
+_INDEX_ETAG = _etag(_INDEX_BYTES)
+INDEX_MAX_AGE = 300
+
+# generate_dummy_exam ignores its arguments, so every /generate response
+# has the same body; encode it once.  Drop this if the generator starts
+# using the request parameters.
+_GENERATE_BYTES = orjson.dumps({"questions": _DUMMY_QUESTIONS})
+_GENERATE_ETAG = _etag(_GENERATE_BYTES)
+
+
 @app.get("/")
-def get_index() -> FileResponse:
+async def get_index(request: Request) -> Response:
     """Serve the main HTML page."""
-    return FileResponse(os.path.join(static_dir, "index.html"))
+    headers = {"ETag": _INDEX_ETAG, "Cache-Control": f"public, max-age={INDEX_MAX_AGE}"}
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(_INDEX_BYTES, media_type="text/html", headers=headers)
 
 
 @app.post("/generate")
-def generate_paper(request: PaperRequest) -> Dict:
+async def generate_paper(request: PaperRequest, http_request: Request) -> Response:
     """Generate a dummy paper for the given request parameters."""
-    questions = generate_dummy_exam(
-        request.board, request.level, request.subject, request.topics
-    )
-    return {"questions": questions}
+    headers = {"ETag": _GENERATE_ETAG}
+    if http_request.headers.get("if-none-match") == _GENERATE_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(_GENERATE_BYTES, media_type="application/json", headers=headers)
 
 
 @app.post("/mark_bundle")
-def mark_bundle(bundle: MarkBundle) -> Dict:
+async def mark_bundle(bundle: MarkBundle) -> Dict:
     """Mark a submitted paper and return the results."""
+    # Malformed bodies are already rejected with a 422 by pydantic before
+    # this runs, so only marking errors need translating here.
     try:
-        questions = [q.model_dump() for q in bundle.paper]
-        return mark_paper(questions, bundle.answers)
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=str(exc))
+        if _is_large_submission([bundle]):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, mark_paper, bundle.paper, bundle.answers
+            )
+        return mark_paper(bundle.paper, bundle.answers)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"bad question shape: {exc}")
+
+
+@app.post("/mark_bundle/batch")
+async def mark_batch(batch: MarkBatch) -> Dict:
+    """Mark several submitted papers and return the results in order."""
+    try:
+        if _is_large_submission(batch.bundles):
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                None, mark_batch_bundles, batch.bundles
+            )
+        else:
+            results = mark_batch_bundles(batch.bundles)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"bad question shape: {exc}")
+    return {"results": results}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get("HOST", "127.0.0.1"),
+        port=int(os.environ.get("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count(),
+    )